@@ -8,11 +8,52 @@ bl_info = {
 }
 
 import bpy
-import os
-import tempfile
 import subprocess
 import sys
-from mathutils import Vector, Matrix
+import threading
+import numpy as np
+from mathutils import Vector
+
+# Import PIL once at module load instead of on every paste
+try:
+    from PIL import ImageGrab as _ImageGrab, Image as _PILImage
+except ImportError:
+    _ImageGrab = None
+    _PILImage = None
+
+# Optional SIMD JPEG decoder; several times faster than Pillow builds
+# shipped without libjpeg-turbo
+try:
+    import simplejpeg as _simplejpeg
+except ImportError:
+    _simplejpeg = None
+
+# View/camera space looks down -Z; built once, only ever read
+_FORWARD = Vector((0.0, 0.0, -1.0))
+
+# Pooled float32 conversion buffer. Grabs run on worker threads and can
+# overlap, so the pool hands out exclusive ownership: _take_pix_buf swaps
+# the buffer out (or allocates a fresh one), and it only re-enters the
+# pool via _return_pix_buf once foreach_set has copied the pixels into
+# Blender's own storage.
+_PIX_BUF = None
+_PIX_BUF_LOCK = threading.Lock()
+
+def _take_pix_buf(size):
+    """Take the pooled buffer, allocating when it is absent or mismatched.
+    The caller owns the returned array until _return_pix_buf."""
+    global _PIX_BUF
+    with _PIX_BUF_LOCK:
+        buf = _PIX_BUF
+        _PIX_BUF = None
+    if buf is None or buf.size != size:
+        buf = np.empty(size, dtype=np.float32)
+    return buf
+
+def _return_pix_buf(buf):
+    global _PIX_BUF
+    with _PIX_BUF_LOCK:
+        _PIX_BUF = buf
 
 class InstallPillowOperator(bpy.types.Operator):
     """Install Pillow"""
@@ -23,18 +64,30 @@ class InstallPillowOperator(bpy.types.Operator):
         try:
             import ensurepip
             ensurepip.bootstrap()
-            subprocess.check_call([sys.executable, "-m", "pip", "install", "Pillow"])
-            self.report({'INFO'}, "Pillow installed successfully. Please restart Blender.")
+            subprocess.check_call([sys.executable, "-m", "pip", "install", "Pillow", "simplejpeg"])
+            self.report({'INFO'}, "Pillow and simplejpeg installed successfully. Please restart Blender.")
         except Exception as e:
             self.report({'ERROR'}, f"Failed to install Pillow: {e}")
         return {'FINISHED'}
 
 def ensure_pillow():
+    return _ImageGrab is not None
+
+def _pil_has_turbo():
     try:
-        import PIL
+        from PIL import features
+        return bool(features.check_feature("libjpeg_turbo"))
+    except Exception:
+        # Can't tell on this Pillow build; don't nag
         return True
-    except ImportError:
-        return False
+
+def _decode_image(path):
+    """Decode an image file to a uint8 RGBA array (paste-from-file paths)"""
+    if _simplejpeg is not None and path.lower().endswith((".jpg", ".jpeg")):
+        with open(path, "rb") as f:
+            return _simplejpeg.decode_jpeg(f.read(), colorspace="RGBA")
+    with _PILImage.open(path) as image:
+        return np.asarray(image.convert("RGBA"), dtype=np.uint8)
 
 def get_camera_facing_position(context, distance=5.0):
     """Calculate position and rotation to face the camera"""
@@ -47,172 +100,227 @@ def get_camera_facing_position(context, distance=5.0):
     
     # Get camera matrix
     camera_matrix = camera.matrix_world
-    
+
     # Calculate forward direction (camera looks down negative Z)
-    forward_vector = camera_matrix.to_3x3() @ Vector((0, 0, -1))
-    forward = forward_vector.normalized()
-    
+    forward = (camera_matrix.to_3x3() @ _FORWARD).normalized()
+
     # Calculate position in front of camera
-    camera_location = camera_matrix.translation
-    position = camera_location + forward * distance
-    
-    # Calculate rotation to face camera
-    # Create a rotation matrix that faces the camera
-    direction = (camera_location - position).normalized()
-    
-    # Create rotation matrix
-    if abs(direction.z) < 0.999:
-        up = Vector((0, 0, 1))
-        right = direction.cross(up).normalized()
-        up = right.cross(direction).normalized()
-    else:
-        right = Vector((1, 0, 0))
-        up = Vector((0, 1, 0))
-    
-    rotation_matrix = Matrix((
-        right,
-        up,
-        -direction
-    )).transposed()
-    
-    rotation = rotation_matrix.to_euler()
-    
+    position = camera_matrix.translation + forward * distance
+
+    # The offset is along the camera's own -Z axis, so facing back at the
+    # camera is simply the camera's own world rotation
+    rotation = camera_matrix.to_euler()
+
     return position, rotation
 
 def get_viewport_facing_position(context, distance=5.0):
     """Calculate position in front of the user's viewport view"""
-    # Get the 3D viewport region
-    for area in context.screen.areas:
-        if area.type == 'VIEW_3D':
-            for region in area.regions:
-                if region.type == 'WINDOW':
-                    # Get viewport view matrix
-                    rv3d = area.spaces[0].region_3d
-                    view_matrix = rv3d.view_matrix
-                    
-                    # Get view location and direction
-                    view_location = view_matrix.inverted().translation
-                    view_rotation = view_matrix.inverted().to_euler()
-                    
-                    # Calculate forward direction from viewport
-                    forward = view_matrix.inverted().to_3x3() @ Vector((0, 0, -1))
-                    forward = forward.normalized()
-                    
-                    # Position in front of viewport
-                    position = view_location + forward * distance
-                    
-                    return position, view_rotation
-    
-    # Fallback to origin if no viewport found
-    return Vector((0, 0, 0)), (0, 0, 0)
+    # poll guarantees a VIEW_3D context, so use its viewport directly
+    # instead of scanning every area/region on the screen
+    rv3d = getattr(context.space_data, "region_3d", None)
+    if rv3d is None:
+        # Fallback to origin if no viewport found
+        return Vector((0, 0, 0)), (0, 0, 0)
 
-class PastePureRefImageOperator(bpy.types.Operator):
-    """Paste Image from Clipboard"""
-    bl_idname = "image.paste_pureref_image"
-    bl_label = "Paste PureRef Image"
-    bl_icon = 'IMAGE_DATA'
+    # Invert the view matrix once and reuse it; each inverted() call is a
+    # full 4x4 solve
+    inv = rv3d.view_matrix.inverted()
+
+    # Get view location and direction
+    view_location = inv.translation
+    view_rotation = inv.to_euler()
+
+    # Calculate forward direction from viewport
+    forward = (inv.to_3x3() @ _FORWARD).normalized()
+
+    # Position in front of viewport
+    position = view_location + forward * distance
+
+    return position, view_rotation
+
+def _grab_clipboard_pixels():
+    """Grab and convert the clipboard image; safe to run off the main thread.
+
+    Returns (pixels, width, height) with pixels as a float32 RGBA array,
+    or None when the clipboard holds no image. Touches no bpy data.
+    """
+    image = _ImageGrab.grabclipboard()
+    if not isinstance(image, _PILImage.Image):
+        return None
+
+    width, height = image.size
+    mode = image.mode
+    if mode == "RGBA":
+        # asarray views the Pillow buffer directly, no copy
+        arr = np.asarray(image, dtype=np.uint8)
+    elif mode == "RGB":
+        # Clipboard DIBs usually arrive as RGB; widen to RGBA ourselves in
+        # one pass instead of paying Pillow's convert() for an extra copy
+        rgb = np.asarray(image, dtype=np.uint8)
+        arr = np.empty((height, width, 4), dtype=np.uint8)
+        arr[:, :, :3] = rgb
+        arr[:, :, 3] = 255
+    else:
+        arr = np.asarray(image.convert("RGBA"), dtype=np.uint8)
+    pixels = _take_pix_buf(width * height * 4).reshape(height, width, 4)
+
+    # Blender stores pixel rows bottom-up, so flip the source view while
+    # np.multiply casts and scales in one vectorized pass straight into
+    # the pooled buffer - no intermediate float32 allocation.
+    np.multiply(arr[::-1], np.float32(1.0 / 255.0), out=pixels, casting='unsafe')
+
+    return pixels, width, height
+
+def _link_pasted_image(context, pixels, width, height, use_cursor):
+    """Build the Blender image and empty from converted pixels (main thread only);
+    returns a (level, message) report"""
+    # Build the Blender image straight from the converted buffer:
+    # no temp file, no encode/decode pass (не используем import_image.to_plane)
+    # Drop the previous paste's datablock if nothing uses it anymore, so a
+    # long session doesn't pile up clipboard_image.001, .002, ... buffers
+    old = bpy.data.images.get("clipboard_image")
+    if old is not None and old.users == 0:
+        bpy.data.images.remove(old)
+
+    img = bpy.data.images.new("clipboard_image", width, height, alpha=True)
+    img.pixels.foreach_set(pixels.ravel())
+    # foreach_set copied the pixels into Blender's storage, so the
+    # conversion buffer can go back to the pool for the next paste.
+    # Packing (a full PNG encode) is deferred to the save_pre handler so
+    # the interactive paste path never pays for it.
+    _return_pix_buf(pixels.ravel())
+
+    ref = bpy.data.objects.new(name=img.name, object_data=None)
+    ref.empty_display_type = 'IMAGE'
+    ref.data = img
+
+    if use_cursor:
+        # Позиция 3D курсора, повёрнутая к пользователю
+        ref.location = context.scene.cursor.location
+        _, rotation = get_viewport_facing_position(context, distance=0.0)
+    else:
+        # Position in front of user's viewport view
+        position, rotation = get_viewport_facing_position(context, distance=5.0)
+        ref.location = position
+    ref.rotation_euler = rotation
+
+    # Scale uniformly to preserve aspect ratio
+    base_scale = 2.0  # Base size
+    ref.scale = (base_scale, base_scale, 1.0)  # Uniform scaling
+
+    context.collection.objects.link(ref)
+
+    # Select the new object
+    context.view_layer.objects.active = ref
+    ref.select_set(True)
+
+    if use_cursor:
+        return 'INFO', "Image pasted from clipboard at cursor position facing user"
+    return 'INFO', "Image pasted from clipboard and positioned in front of viewport"
+
+def _paste_from_clipboard(context, use_cursor):
+    """Shared synchronous paste path; returns a (level, message) report"""
+    result = _grab_clipboard_pixels()
+    if result is None:
+        return 'WARNING', "No image in clipboard"
+
+    pixels, width, height = result
+    return _link_pasted_image(context, pixels, width, height, use_cursor)
+
+class PastePureRefBase:
+    """Shared paste behaviour. Interactive use runs the clipboard grab and
+    pixel conversion on a worker thread so large pastes don't freeze the UI;
+    execute stays synchronous for script calls."""
+    use_cursor = False
 
     @classmethod
     def poll(cls, context):
         return context.area.type == 'VIEW_3D'
 
-    def execute(self, context):
-        try:
-            from PIL import ImageGrab, Image
-            image = ImageGrab.grabclipboard()
-            if isinstance(image, Image.Image):
-                temp_dir = tempfile.gettempdir()
-                temp_path = os.path.join(temp_dir, "clipboard_image.png")
-                image.save(temp_path)
-                
-                # Load image and create empty object (не используем import_image.to_plane)
-                img = bpy.data.images.load(temp_path)
-                
-                ref = bpy.data.objects.new(name=img.name, object_data=None)
-                ref.empty_display_type = 'IMAGE'
-                ref.data = img
-                
-                # Position in front of user's viewport view
-                position, rotation = get_viewport_facing_position(context, distance=5.0)
-                ref.location = position
-                ref.rotation_euler = rotation
-                
-                # Scale uniformly to preserve aspect ratio
-                base_scale = 2.0  # Base size
-                ref.scale = (base_scale, base_scale, 1.0)  # Uniform scaling
-                
-                context.collection.objects.link(ref)
-                
-                # Select the new object
-                bpy.context.view_layer.objects.active = ref
-                ref.select_set(True)
-                
-                self.report({'INFO'}, "Image pasted from clipboard and positioned in front of viewport")
-                    
-            else:
-                self.report({'WARNING'}, "No image in clipboard")
-        except ImportError:
+    def invoke(self, context, event):
+        if _ImageGrab is None:
             self.report({'ERROR'}, "Pillow is not installed. Please install Pillow from the add-on preferences and restart Blender.")
+            return {'CANCELLED'}
+
+        self._result = None
+        self._error = None
+        self._done = False
+        self._timer = None
+        self._thread = threading.Thread(target=self._grab, daemon=True)
+        self._thread.start()
+
+        wm = context.window_manager
+        self._timer = wm.event_timer_add(0.05, window=context.window)
+        wm.modal_handler_add(self)
+        return {'RUNNING_MODAL'}
+
+    def cancel(self, context):
+        # Blender cancels the modal itself on e.g. file load or window
+        # close; make sure the timer doesn't outlive the operator
+        if self._timer is not None:
+            context.window_manager.event_timer_remove(self._timer)
+            self._timer = None
+
+    def _grab(self):
+        # Worker thread: clipboard copy and numpy conversion only, no bpy
+        try:
+            self._result = _grab_clipboard_pixels()
         except Exception as e:
-            self.report({'ERROR'}, str(e))
-        
-        return {'FINISHED'}
+            self._error = e
+        finally:
+            self._done = True
 
-class PastePureRefFromCursorOperator(bpy.types.Operator):
-    """Paste Image from Clipboard at Cursor"""
-    bl_idname = "image.paste_pureref_from_cursor"
-    bl_label = "Paste PureRef from Cursor"
-    bl_icon = 'IMAGE_DATA'
+    def modal(self, context, event):
+        if event.type != 'TIMER':
+            return {'PASS_THROUGH'}
+        if not self._done:
+            return {'RUNNING_MODAL'}
 
-    @classmethod
-    def poll(cls, context):
-        return context.area.type == 'VIEW_3D'
+        context.window_manager.event_timer_remove(self._timer)
+        self._timer = None
+
+        if self._error is not None:
+            self.report({'ERROR'}, str(self._error))
+            return {'CANCELLED'}
+        if self._result is None:
+            self.report({'WARNING'}, "No image in clipboard")
+            return {'FINISHED'}
 
-    def execute(self, context):
         try:
-            from PIL import ImageGrab, Image
-            image = ImageGrab.grabclipboard()
-            if isinstance(image, Image.Image):
-                temp_dir = tempfile.gettempdir()
-                temp_path = os.path.join(temp_dir, "clipboard_image.png")
-                image.save(temp_path)
-                
-                # Load image and create empty object
-                img = bpy.data.images.load(temp_path)
-                
-                ref = bpy.data.objects.new(name=img.name, object_data=None)
-                ref.empty_display_type = 'IMAGE'
-                ref.data = img
-                
-                # Позиция 3D курсора
-                cursor_location = context.scene.cursor.location
-                ref.location = cursor_location
-                
-                # Используем ту же логику поворота к пользователю, что и в первой кнопке
-                _, rotation = get_viewport_facing_position(context, distance=0.0)
-                ref.rotation_euler = rotation
-                
-                # Uniform scaling to preserve aspect ratio
-                base_scale = 2.0
-                ref.scale = (base_scale, base_scale, 1.0)
-                
-                context.collection.objects.link(ref)
-                
-                # Select the new object
-                bpy.context.view_layer.objects.active = ref
-                ref.select_set(True)
-                
-                self.report({'INFO'}, "Image pasted from clipboard at cursor position facing user")
-                    
-            else:
-                self.report({'WARNING'}, "No image in clipboard")
-        except ImportError:
+            pixels, width, height = self._result
+            level, message = _link_pasted_image(context, pixels, width, height, self.use_cursor)
+            self.report({level}, message)
+        except Exception as e:
+            self.report({'ERROR'}, str(e))
+
+        return {'FINISHED'}
+
+    def execute(self, context):
+        if _ImageGrab is None:
             self.report({'ERROR'}, "Pillow is not installed. Please install Pillow from the add-on preferences and restart Blender.")
+            return {'CANCELLED'}
+        try:
+            level, message = _paste_from_clipboard(context, use_cursor=self.use_cursor)
+            self.report({level}, message)
         except Exception as e:
             self.report({'ERROR'}, str(e))
-        
+
         return {'FINISHED'}
 
+class PastePureRefImageOperator(PastePureRefBase, bpy.types.Operator):
+    """Paste Image from Clipboard"""
+    bl_idname = "image.paste_pureref_image"
+    bl_label = "Paste PureRef Image"
+    bl_icon = 'IMAGE_DATA'
+    use_cursor = False
+
+class PastePureRefFromCursorOperator(PastePureRefBase, bpy.types.Operator):
+    """Paste Image from Clipboard at Cursor"""
+    bl_idname = "image.paste_pureref_from_cursor"
+    bl_label = "Paste PureRef from Cursor"
+    bl_icon = 'IMAGE_DATA'
+    use_cursor = True
+
 class PasterefPreferences(bpy.types.AddonPreferences):
     bl_idname = __name__
 
@@ -221,24 +329,45 @@ class PasterefPreferences(bpy.types.AddonPreferences):
         if not ensure_pillow():
             layout.operator(InstallPillowOperator.bl_idname, text="Install Pillow")
             layout.label(text="Please restart Blender after installation.", icon='INFO')
+        elif _simplejpeg is None and not _pil_has_turbo():
+            layout.label(text="Pillow was built without libjpeg-turbo; JPEG decoding will be slow.", icon='ERROR')
+
+# All classes register on add-on enable, batched through the factory
+# helper; the operators must exist immediately for keymaps, operator
+# search and script calls, not just the Add menu
+_register_classes, _unregister_classes = bpy.utils.register_classes_factory((
+    InstallPillowOperator,
+    PastePureRefImageOperator,
+    PastePureRefFromCursorOperator,
+    PasterefPreferences,
+))
 
 def menu_func(self, context):
     self.layout.operator(PastePureRefImageOperator.bl_idname, icon='IMAGE_DATA')
     self.layout.operator(PastePureRefFromCursorOperator.bl_idname, icon='IMAGE_DATA')
 
+@bpy.app.handlers.persistent
+def _pack_clipboard_images(_filepath):
+    # Generated images keep their pixels in memory only, so pasted images
+    # must be packed to survive a .blend save/reload. pack() runs a full
+    # PNG encode, so do it here instead of on every interactive paste:
+    # only a save pays for it, and only for still-unpacked pastes.
+    for img in bpy.data.images:
+        if (img.source == 'GENERATED'
+                and img.packed_file is None
+                and img.name.startswith("clipboard_image")):
+            img.pack()
+
 def register():
-    bpy.utils.register_class(InstallPillowOperator)
-    bpy.utils.register_class(PastePureRefImageOperator)
-    bpy.utils.register_class(PastePureRefFromCursorOperator)
-    bpy.utils.register_class(PasterefPreferences)
+    _register_classes()
     bpy.types.VIEW3D_MT_add.append(menu_func)
+    bpy.app.handlers.save_pre.append(_pack_clipboard_images)
 
 def unregister():
-    bpy.utils.unregister_class(InstallPillowOperator)
-    bpy.utils.unregister_class(PastePureRefImageOperator)
-    bpy.utils.unregister_class(PastePureRefFromCursorOperator)
-    bpy.utils.unregister_class(PasterefPreferences)
+    _unregister_classes()
     bpy.types.VIEW3D_MT_add.remove(menu_func)
+    if _pack_clipboard_images in bpy.app.handlers.save_pre:
+        bpy.app.handlers.save_pre.remove(_pack_clipboard_images)
 
 if __name__ == "__main__":
     register()